@@ -2,11 +2,17 @@ from __future__ import annotations
 
 import asyncio
 import cProfile
+import io
+import itertools
+import struct
+from concurrent.futures import Executor, ProcessPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass
-from subprocess import check_call
+from subprocess import run
 from time import monotonic
-from typing import Collection, Dict, Iterator, List, Optional, Tuple
+from typing import Collection, Dict, Iterator, List, Optional, Sequence
+
+from chia_rs import PrivateKey
 
 from chia.consensus.coinbase import create_farmer_coin, create_pool_coin
 from chia.consensus.default_constants import DEFAULT_CONSTANTS
@@ -19,10 +25,12 @@ from chia.types.eligible_coin_spends import UnspentLineageInfo
 from chia.types.mempool_inclusion_status import MempoolInclusionStatus
 from chia.types.spend_bundle import SpendBundle
 from chia.util.batches import to_batches
+from chia.util.hash import std_hash
 from chia.util.ints import uint32, uint64
 
 NUM_ITERS = 200
 NUM_PEERS = 5
+NUM_PUZZLE_HASHES = 4 * NUM_ITERS
 
 
 @contextmanager
@@ -36,15 +44,76 @@ def enable_profiler(profile: bool, name: str) -> Iterator[None]:
 
     pr.create_stats()
     output_file = f"mempool-{name}"
-    pr.dump_stats(output_file + ".profile")
-    check_call(["gprof2dot", "-f", "pstats", "-o", output_file + ".dot", output_file + ".profile"])
-    with open(output_file + ".png", "w+") as f:
-        check_call(["dot", "-T", "png", output_file + ".dot"], stdout=f)
+    render_profile(pr, output_file + ".png")
     print(f"  output written to: {output_file}.png")
 
 
+def render_profile(pr: cProfile.Profile, png_file: str) -> None:
+    # gprof2dot is only needed for profiling, so it's imported lazily. Building
+    # the call graph in-process saves round-tripping the profile through disk
+    # and spawning a separate gprof2dot process for every profile
+    import gprof2dot
+
+    profile = gprof2dot.PstatsParser(pr).parse()
+    # these are the default node and edge thresholds of the gprof2dot CLI
+    profile.prune(0.005, 0.001, None, False)
+    dot = io.StringIO()
+    gprof2dot.DotWriter(dot).graph(profile, gprof2dot.TEMPERATURE_COLORMAP)
+    with open(png_file, "wb") as f:
+        run(["dot", "-T", "png"], input=dot.getvalue().encode(), stdout=f, check=True)
+
+
+# the signing workers each have their own WalletTool. The main process passes
+# along the secret key for every coin, so the workers don't derive any keys
+_worker_wallet: Optional[WalletTool] = None
+
+
+def _init_signing_worker() -> None:
+    global _worker_wallet
+    _worker_wallet = WalletTool(DEFAULT_CONSTANTS)
+
+
+def _sign_spend(
+    coin_bytes: bytes, secret_key_bytes: bytes, fee: int, puzzle_hash: bytes32, change_puzzle_hash: bytes32
+) -> bytes:
+    assert _worker_wallet is not None
+    coin = Coin.from_bytes(coin_bytes)
+    _worker_wallet.puzzle_pk_cache[coin.puzzle_hash] = PrivateKey.from_bytes(secret_key_bytes)
+    amount = uint64(coin.amount // 2)
+    # the change is paid to a puzzle hash picked by the main process, rather
+    # than one derived by whichever worker signs the coin, so the bundles are
+    # the same on every run
+    change = [(change_puzzle_hash, coin.amount - amount - fee)]
+    return bytes(
+        _worker_wallet.generate_signed_transaction(amount, puzzle_hash, coin, fee=fee, additional_outputs=change)
+    )
+
+
+def sign_spends(
+    executor: Executor, wallet: WalletTool, coins: List[Coin], fee: int, puzzle_hashes: Iterator[bytes32]
+) -> List[SpendBundle]:
+    targets = [next(puzzle_hashes) for _ in coins]
+    change_targets = [next(puzzle_hashes) for _ in coins]
+    secret_keys = [bytes(wallet.get_private_key_for_puzzle_hash(c.puzzle_hash)) for c in coins]
+    results = executor.map(
+        _sign_spend,
+        [bytes(c) for c in coins],
+        secret_keys,
+        itertools.repeat(fee),
+        targets,
+        change_targets,
+        chunksize=64,
+    )
+    return [SpendBundle.from_bytes(sb) for sb in results]
+
+
+# a block hash is the height as a 32 byte big-endian integer. Heights fit in
+# 64 bits, so pad with 24 zero bytes
+_HASH_STRUCT = struct.Struct(">24xQ")
+
+
 def make_hash(height: int) -> bytes32:
-    return bytes32(height.to_bytes(32, byteorder="big"))
+    return bytes32(_HASH_STRUCT.pack(height))
 
 
 @dataclass(frozen=True)
@@ -53,6 +122,15 @@ class BenchBlockRecord:
     This is a subset of BlockRecord that the mempool manager uses for peak.
     """
 
+    # dataclass(slots=True) requires python 3.10
+    __slots__ = (
+        "header_hash",
+        "height",
+        "timestamp",
+        "prev_transaction_block_height",
+        "prev_transaction_block_hash",
+    )
+
     header_hash: bytes32
     height: uint32
     timestamp: Optional[uint64]
@@ -76,16 +154,47 @@ def fake_block_record(block_height: uint32, timestamp: uint64) -> BenchBlockReco
     )
 
 
+def make_hashes(heights: Sequence[int]) -> List[bytes32]:
+    """
+    Like make_hash(), but for many heights at once. All hashes are packed into
+    a single buffer by one struct.pack() call.
+    """
+    buf = struct.pack(">" + _HASH_STRUCT.format[1:] * len(heights), *heights)
+    return [bytes32(buf[i : i + 32]) for i in range(0, len(buf), 32)]
+
+
+def fake_block_records(heights: Sequence[uint32], timestamps: Sequence[uint64]) -> List[BenchBlockRecord]:
+    # when the heights are consecutive, the previous block's hash is the same
+    # as the hash of the block before it in the list. Only compute it once
+    all_heights = sorted(set(heights).union(h - 1 for h in heights))
+    hashes = dict(zip(all_heights, make_hashes(all_heights)))
+    return [
+        BenchBlockRecord(
+            header_hash=hashes[block_height],
+            height=block_height,
+            timestamp=timestamp,
+            prev_transaction_block_height=uint32(block_height - 1),
+            prev_transaction_block_hash=hashes[block_height - 1],
+        )
+        for block_height, timestamp in zip(heights, timestamps)
+    ]
+
+
 async def run_mempool_benchmark() -> None:
-    all_coins: Dict[bytes32, CoinRecord] = {}
+    # the coin records are stored as parallel arrays, in insertion order, with
+    # an index from coin ID to position for lookups
+    all_coin_ids: List[bytes32] = []
+    all_coin_records: List[CoinRecord] = []
+    coin_index: Dict[bytes32, int] = {}
+
+    def add_coin_record(rec: CoinRecord) -> None:
+        name = rec.coin.name()
+        coin_index[name] = len(all_coin_ids)
+        all_coin_ids.append(name)
+        all_coin_records.append(rec)
 
     async def get_coin_records(coin_ids: Collection[bytes32]) -> List[CoinRecord]:
-        ret: List[CoinRecord] = []
-        for name in coin_ids:
-            r = all_coins.get(name)
-            if r is not None:
-                ret.append(r)
-        return ret
+        return [all_coin_records[coin_index[name]] for name in coin_ids if name in coin_index]
 
     # We currently don't need to keep track of these for our purpose
     async def get_unspent_lineage_info_for_puzzle_hash(_: bytes32) -> Optional[UnspentLineageInfo]:
@@ -106,58 +215,51 @@ async def run_mempool_benchmark() -> None:
 
     height = uint32(1)
 
-    print("Building SpendBundles")
-    for peer in range(NUM_PEERS):
-        print(f"  peer {peer}")
-        print("     reward coins")
-        unspent: List[Coin] = []
-        for idx in range(NUM_ITERS):
-            height = uint32(height + 1)
+    # deriving a new puzzle hash is relatively expensive. The benchmark doesn't
+    # need every coin to have a unique puzzle hash, so draw from a pool
+    puzzle_hashes = itertools.cycle([wt.get_new_puzzlehash() for _ in range(NUM_PUZZLE_HASHES)])
 
-            # 19 seconds per block
-            timestamp = uint64(timestamp + 19)
+    genesis_challenge = DEFAULT_CONSTANTS.GENESIS_CHALLENGE
+    farmer_reward = uint64(250000000)
+    pool_reward = uint64(1750000000)
 
-            # farm rewards
-            farmer_coin = create_farmer_coin(
-                height, wt.get_new_puzzlehash(), uint64(250000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE
-            )
-            pool_coin = create_pool_coin(
-                height, wt.get_new_puzzlehash(), uint64(1750000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE
-            )
-            all_coins[farmer_coin.name()] = CoinRecord(farmer_coin, height, uint32(0), True, timestamp)
-            all_coins[pool_coin.name()] = CoinRecord(pool_coin, height, uint32(0), True, timestamp)
-            unspent.extend([farmer_coin, pool_coin])
-
-        print("     spend bundles")
-        bundles: List[SpendBundle] = []
-        for coin in unspent:
-            tx: SpendBundle = wt.generate_signed_transaction(
-                uint64(coin.amount // 2), wt.get_new_puzzlehash(), coin, fee=peer + idx
-            )
-            bundles.append(tx)
-        spend_bundles.append(bundles)
-
-        bundles = []
-        print("     replacement spend bundles")
-        for coin in unspent:
-            tx = wt.generate_signed_transaction(
-                uint64(coin.amount // 2), wt.get_new_puzzlehash(), coin, fee=peer + idx + 10000000
-            )
-            bundles.append(tx)
-        replacement_spend_bundles.append(bundles)
-
-        bundles = []
-        print("     large spend bundles")
-        for batch in to_batches(unspent, 200):
-            print(f"{len(batch.entries)} coins")
-            tx = SpendBundle.aggregate(
-                [
-                    wt.generate_signed_transaction(uint64(c.amount // 2), wt.get_new_puzzlehash(), c, fee=peer + idx)
-                    for c in batch.entries
-                ]
-            )
-            bundles.append(tx)
-        large_spend_bundles.append(bundles)
+    print("Building SpendBundles")
+    with ProcessPoolExecutor(initializer=_init_signing_worker) as executor:
+        for peer in range(NUM_PEERS):
+            print(f"  peer {peer}")
+            print("     reward coins")
+            unspent: List[Coin] = []
+            for idx in range(NUM_ITERS):
+                height = uint32(height + 1)
+
+                # 19 seconds per block
+                timestamp = uint64(timestamp + 19)
+
+                # farm rewards
+                farmer_coin = create_farmer_coin(height, next(puzzle_hashes), farmer_reward, genesis_challenge)
+                pool_coin = create_pool_coin(height, next(puzzle_hashes), pool_reward, genesis_challenge)
+                add_coin_record(CoinRecord(farmer_coin, height, uint32(0), True, timestamp))
+                add_coin_record(CoinRecord(pool_coin, height, uint32(0), True, timestamp))
+                unspent.extend([farmer_coin, pool_coin])
+
+            print("     spend bundles")
+            spend_bundles.append(sign_spends(executor, wt, unspent, peer + idx, puzzle_hashes))
+
+            print("     replacement spend bundles")
+            replacement_spend_bundles.append(sign_spends(executor, wt, unspent, peer + idx + 10000000, puzzle_hashes))
+
+            # the large bundles are just aggregates of the regular ones, there's
+            # no need to sign all the coins again
+            bundles: List[SpendBundle] = []
+            print("     large spend bundles")
+            for batch in to_batches(spend_bundles[peer], 200):
+                print(f"{len(batch.entries)} coins")
+                bundles.append(SpendBundle.aggregate(batch.entries))
+            large_spend_bundles.append(bundles)
+
+    # each fake block in the new_peak() benchmarks spends one coin. The records
+    # and these lists are paired up lazily, to avoid building a list of tuples
+    spent_coins = [[coin_id] for coin_id in all_coin_ids]
 
     start_height = height
     for single_threaded in [False, True]:
@@ -173,9 +275,21 @@ async def run_mempool_benchmark() -> None:
         await mempool.new_peak(rec, None)
 
         async def add_spend_bundles(spend_bundles: List[SpendBundle]) -> None:
-            for tx in spend_bundles:
-                spend_bundle_id = tx.name()
-                npc = await mempool.pre_validate_spendbundle(tx, None, spend_bundle_id)
+            # pre-validation runs in the worker pool. Submit all of this peer's
+            # bundles at once, to keep the workers busy, then add them to the
+            # mempool in order
+            # the bundle ID is the hash of the serialized bundle. Serialize each
+            # bundle once and pass the bytes along, so pre-validation doesn't
+            # have to serialize it again
+            spend_bundle_bytes = [bytes(tx) for tx in spend_bundles]
+            spend_bundle_ids = [std_hash(b) for b in spend_bundle_bytes]
+            npcs = await asyncio.gather(
+                *(
+                    mempool.pre_validate_spendbundle(tx, tx_bytes, spend_bundle_id)
+                    for tx, tx_bytes, spend_bundle_id in zip(spend_bundles, spend_bundle_bytes, spend_bundle_ids)
+                )
+            )
+            for tx, npc, spend_bundle_id in zip(spend_bundles, npcs, spend_bundle_ids):
                 assert npc is not None
                 info = await mempool.add_spend_bundle(tx, npc, spend_bundle_id, height)
                 assert info.status == MempoolInclusionStatus.SUCCESS
@@ -196,7 +310,7 @@ async def run_mempool_benchmark() -> None:
         print(f"  time: {stop - start:0.4f}s")
         print(f"  per call: {(stop - start) / total_bundles * 1000:0.2f}ms")
 
-        mempool = MempoolManager(get_coin_records, DEFAULT_CONSTANTS, single_threaded=single_threaded)
+        mempool.reset()
 
         height = start_height
         rec = fake_block_record(height, timestamp)
@@ -241,41 +355,53 @@ async def run_mempool_benchmark() -> None:
         print(f"  per call: {(stop - start) / 500 * 1000:0.2f}ms")
 
         print("\nProfiling new_peak() (optimized)")
-        blocks: List[Tuple[BenchBlockRecord, List[bytes32]]] = []
-        for coin_id in all_coins.keys():
+        heights: List[uint32] = []
+        timestamps: List[uint64] = []
+        for _ in all_coin_ids:
             height = uint32(height + 1)
             timestamp = uint64(timestamp + 19)
-            rec = fake_block_record(height, timestamp)
-            blocks.append((rec, [coin_id]))
+            heights.append(height)
+            timestamps.append(timestamp)
+        records = fake_block_records(heights, timestamps)
 
         with enable_profiler(True, f"new-peak-{suffix}"):
             start = monotonic()
-            for rec, spends in blocks:
+            for rec, spends in zip(records, spent_coins):
                 await mempool.new_peak(rec, spends)
             stop = monotonic()
         print(f"  time: {stop - start:0.4f}s")
-        print(f"  per call: {(stop - start) / len(blocks) * 1000:0.2f}ms")
+        print(f"  per call: {(stop - start) / len(records) * 1000:0.2f}ms")
 
         print("\nProfiling new_peak() (reorg)")
-        blocks = []
-        for coin_id in all_coins.keys():
+        heights = []
+        timestamps = []
+        for _ in all_coin_ids:
             height = uint32(height + 2)
             timestamp = uint64(timestamp + 28)
-            rec = fake_block_record(height, timestamp)
-            blocks.append((rec, [coin_id]))
+            heights.append(height)
+            timestamps.append(timestamp)
+        records = fake_block_records(heights, timestamps)
 
         with enable_profiler(True, f"new-peak-reorg-{suffix}"):
             start = monotonic()
-            for rec, spends in blocks:
+            for rec, spends in zip(records, spent_coins):
                 await mempool.new_peak(rec, spends)
             stop = monotonic()
         print(f"  time: {stop - start:0.4f}s")
-        print(f"  per call: {(stop - start) / len(blocks) * 1000:0.2f}ms")
+        print(f"  per call: {(stop - start) / len(records) * 1000:0.2f}ms")
 
 
 if __name__ == "__main__":
     import logging
 
+    # uvloop is an optional, faster, drop-in event loop
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     logger = logging.getLogger()
     logger.addHandler(logging.StreamHandler())
     logger.setLevel(logging.WARNING)
@@ -49,9 +49,12 @@ async def _validate_and_add_block(
     skip_prevalidation: bool = False,
     fork_info: Optional[ForkInfo] = None,
     use_bls_cache: bool = False,
+    bls_cache: Optional[BLSCache] = None,
 ) -> None:
     # Tries to validate and add the block, and checks that there are no errors in the process and that the
     # block is added to the peak.
+    # If bls_cache is passed in, it's used (and populated) when validating the block's signature. This lets
+    # callers share the pairings across blocks including the same spends.
     # If expected_result is not None, that result will be enforced.
     # If expected_error is not None, that error will be enforced. If expected_error is not None,
     # add_block must return Err.INVALID_BLOCK.
@@ -82,10 +85,8 @@ async def _validate_and_add_block(
         await check_block_store_invariant(blockchain)
         return None
 
-    if use_bls_cache:
+    if use_bls_cache and bls_cache is None:
         bls_cache = BLSCache(100)
-    else:
-        bls_cache = None
 
     (
         result,
@@ -175,3 +176,28 @@ async def _validate_and_add_block_no_error(
         skip_prevalidation=skip_prevalidation,
         fork_info=fork_info,
     )
+
+
+async def _validate_and_add_blocks(
+    blockchain: Blockchain,
+    blocks: List[FullBlock],
+    *,
+    bls_cache: Optional[BLSCache] = None,
+) -> None:
+    # Validates and adds consecutive blocks, checking that each one extends the peak. The blocks are
+    # pre-validated as a single batch, rather than one call each like _validate_and_add_block() does.
+    await check_block_store_invariant(blockchain)
+    # validate_signatures must be False in order to trigger add_block() to
+    # validate the signature.
+    pre_validation_results: List[PreValidationResult] = await blockchain.pre_validate_blocks_multiprocessing(
+        blocks, {}, validate_signatures=False
+    )
+    for block, results in zip(blocks, pre_validation_results):
+        if results.error is not None:
+            raise AssertionError(Err(results.error))
+        result, err, _ = await blockchain.add_block(block, results, bls_cache)
+        await check_block_store_invariant(blockchain)
+        if err is not None:
+            raise AssertionError(err)
+        if result != AddBlockResult.NEW_PEAK:
+            raise AssertionError(f"Block was not added: {result}")
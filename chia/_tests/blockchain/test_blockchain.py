@@ -45,7 +45,7 @@ from chia.types.blockchain_format.vdf import VDFInfo, VDFProof, validate_vdf
 from chia.types.condition_opcodes import ConditionOpcode
 from chia.types.condition_with_args import ConditionWithArgs
 from chia.types.end_of_slot_bundle import EndOfSubSlotBundle
-from chia.types.full_block import FullBlock
+from chia.types.full_block import FullBlock, reward_coin_by_puzzle_hash
 from chia.types.generator_types import BlockGenerator
 from chia.types.spend_bundle import SpendBundle
 from chia.types.unfinished_block import UnfinishedBlock
@@ -3511,11 +3511,7 @@ class TestReorgs:
             2, blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
         )
 
-        spend_block = blocks[10]
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
+        spend_coin = reward_coin_by_puzzle_hash(blocks[10], coinbase_puzzlehash)
         assert spend_coin is not None
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1_000), receiver_puzzlehash, spend_coin)
 
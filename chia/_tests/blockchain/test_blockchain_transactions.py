@@ -1,67 +1,156 @@
 from __future__ import annotations
 
 import logging
-from typing import Tuple
+from functools import partial
+from typing import Dict, List, Tuple
 
 import pytest
+from chia_rs import BLSCache
 from clvm.casts import int_to_bytes
 
-from chia._tests.blockchain.blockchain_test_utils import _validate_and_add_block
+from chia._tests.blockchain.blockchain_test_utils import _validate_and_add_block, _validate_and_add_blocks
 from chia._tests.util.generator_tools_testing import run_and_get_removals_and_additions
+from chia.consensus.constants import ConsensusConstants
+from chia.full_node.full_node import FullNode
 from chia.full_node.full_node_api import FullNodeAPI
 from chia.protocols import wallet_protocol
-from chia.server.server import ChiaServer
 from chia.simulator.block_tools import BlockTools, test_constants
 from chia.simulator.wallet_tools import WalletTool
+from chia.types.blockchain_format.coin import Coin
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.condition_opcodes import ConditionOpcode
 from chia.types.condition_with_args import ConditionWithArgs
-from chia.types.spend_bundle import SpendBundle, estimate_fees
+from chia.types.full_block import FullBlock, reward_coin_by_puzzle_hash
+from chia.types.peer_info import PeerInfo
+from chia.types.spend_bundle import SpendBundle
 from chia.util.errors import ConsensusError, Err
 from chia.util.ints import uint32, uint64
 from chia.wallet.conditions import AssertCoinAnnouncement, AssertPuzzleAnnouncement
 
-BURN_PUZZLE_HASH = bytes32(b"0" * 32)
 
 WALLET_A = WalletTool(test_constants)
 WALLET_A_PUZZLE_HASHES = [WALLET_A.get_new_puzzlehash() for _ in range(5)]
 
+
+class ConditionsBuilder:
+    """
+    Collects conditions as parallel lists of opcodes and arguments, and only
+    builds the ConditionWithArgs objects once the condition dict is needed.
+    """
+
+    __slots__ = ("opcodes", "args")
+
+    def __init__(self) -> None:
+        self.opcodes: List[ConditionOpcode] = []
+        self.args: List[List[bytes]] = []
+
+    def add(self, opcode: ConditionOpcode, args: List[bytes]) -> ConditionsBuilder:
+        self.opcodes.append(opcode)
+        self.args.append(args)
+        return self
+
+    def to_dict(self) -> Dict[ConditionOpcode, List[ConditionWithArgs]]:
+        # generate_signed_transaction() modifies the dict it's passed, so every
+        # call returns a new one
+        ret: Dict[ConditionOpcode, List[ConditionWithArgs]] = {}
+        for opcode, args in zip(self.opcodes, self.args):
+            ret.setdefault(opcode, []).append(ConditionWithArgs(opcode, args))
+        return ret
+
+
+# the conditions whose shape doesn't depend on the test's coins are only built
+# once. to_dict() still returns a new dict every time
+CREATE_COIN_ANNOUNCEMENT_TEST = ConditionsBuilder().add(ConditionOpcode.CREATE_COIN_ANNOUNCEMENT, [b"test"])
+CREATE_PUZZLE_ANNOUNCEMENT_TEST = ConditionsBuilder().add(ConditionOpcode.CREATE_PUZZLE_ANNOUNCEMENT, [b"test"])
+ASSERT_HEIGHT_ABSOLUTE_10 = ConditionsBuilder().add(ConditionOpcode.ASSERT_HEIGHT_ABSOLUTE, [int_to_bytes(10)])
+ASSERT_HEIGHT_RELATIVE_9 = ConditionsBuilder().add(ConditionOpcode.ASSERT_HEIGHT_RELATIVE, [int_to_bytes(9)])
+ASSERT_SECONDS_RELATIVE_300 = ConditionsBuilder().add(ConditionOpcode.ASSERT_SECONDS_RELATIVE, [int_to_bytes(300)])
+RESERVE_FEE_10 = ConditionsBuilder().add(ConditionOpcode.RESERVE_FEE, [int_to_bytes(10)])
+
+
+# belongs to nobody
+BURN_PUZZLE_HASH = bytes32(b"0" * 32)
+
+
 log = logging.getLogger(__name__)
 
+# many of the tests validate the same signatures, so they share the pairings
+BLS_CACHE = BLSCache(1000)
+validate_and_add_block = partial(_validate_and_add_block, bls_cache=BLS_CACHE)
+validate_and_add_blocks = partial(_validate_and_add_blocks, bls_cache=BLS_CACHE)
+
+# every test here builds its own chain on a fresh, function scoped, one_full_node
+# so they are independent of each other and -n auto is free to spread them
+# over all the xdist workers
+pytestmark = pytest.mark.anyio
+
+
+def additions_by_ph(block: FullBlock, *, height: uint32, constants: ConsensusConstants) -> Dict[bytes32, Coin]:
+    # the first coin paying to a puzzle hash wins
+    _, additions = run_and_get_removals_and_additions(
+        block, constants.MAX_BLOCK_COST_CLVM, height=height, constants=constants
+    )
+    coins: Dict[bytes32, Coin] = {}
+    for coin in additions:
+        coins.setdefault(coin.puzzle_hash, coin)
+    return coins
+
+
+async def add_prefarmed_blocks(
+    full_node: FullNode, prefarmed_blocks: List[FullBlock], num_blocks: int, spend_index: int = 2
+) -> Tuple[List[FullBlock], Coin]:
+    """
+    Adds the first num_blocks blocks of the base chain to the full node. Returns
+    those blocks along with the farmer reward coin of blocks[spend_index].
+    """
+    blocks = prefarmed_blocks[:num_blocks]
+    # the blocks are validated as a single batch. Only the last one goes through
+    # add_block(), so the full node (and its mempool) processes the new peak
+    success, _, err = await full_node.add_block_batch(blocks[:-1], PeerInfo("0.0.0.0", 0), None)
+    assert success, err
+    await full_node.add_block(blocks[-1])
+
+    spend_coin = reward_coin_by_puzzle_hash(blocks[spend_index], WALLET_A_PUZZLE_HASHES[0])
+    assert spend_coin is not None
+    return blocks, spend_coin
+
+
+# the longest base chain any test in this module needs
+PREFARMED_BLOCKS = 15
+
+
+@pytest.fixture(scope="session")
+def prefarmed_blocks(bt: BlockTools) -> List[FullBlock]:
+    # farming is expensive, so the base chain is only farmed once per session.
+    # Tests use a prefix of it, which is a valid chain in its own right
+    return bt.get_consecutive_blocks(
+        PREFARMED_BLOCKS, farmer_reward_puzzle_hash=WALLET_A_PUZZLE_HASHES[0], guarantee_transaction_block=True
+    )
+
 
 class TestBlockchainTransactions:
-    @pytest.mark.anyio
     async def test_basic_blockchain_tx(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block, None)
-
-        spend_block = blocks[2]
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
-
-        assert spend_coin is not None
+        blocks, spend_coin = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_puzzlehash, spend_coin)
 
         assert spend_bundle is not None
+        spend_bundle_id = spend_bundle.name()
         tx: wallet_protocol.SendTransaction = wallet_protocol.SendTransaction(spend_bundle)
 
         await full_node_api_1.send_transaction(tx)
 
-        sb = full_node_1.mempool_manager.get_spendbundle(spend_bundle.name())
+        sb = full_node_1.mempool_manager.get_spendbundle(spend_bundle_id)
         assert sb == spend_bundle
 
         last_block = blocks[-1]
@@ -96,34 +185,24 @@ class TestBlockchainTransactions:
             assert not unspent.spent
             assert not unspent.coinbase
 
-    @pytest.mark.anyio
     async def test_validate_blockchain_with_double_spend(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 5
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        spend_block = blocks[2]
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
-        assert spend_coin is not None
+        blocks, spend_coin = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_puzzlehash, spend_coin)
         spend_bundle_double = wallet_a.generate_signed_transaction(uint64(1001), receiver_puzzlehash, spend_coin)
 
-        block_spendbundle = SpendBundle.aggregate([spend_bundle, spend_bundle_double])
+        block_spendbundle = SpendBundle.aggregate((spend_bundle, spend_bundle_double))
 
         new_blocks = bt.get_consecutive_blocks(
             1,
@@ -134,32 +213,21 @@ class TestBlockchainTransactions:
         )
 
         next_block = new_blocks[-1]
-        await _validate_and_add_block(full_node_1.blockchain, next_block, expected_error=Err.DOUBLE_SPEND)
+        await validate_and_add_block(full_node_1.blockchain, next_block, expected_error=Err.DOUBLE_SPEND)
 
-    @pytest.mark.anyio
     async def test_validate_blockchain_duplicate_output(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 3
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        spend_block = blocks[2]
-
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
-        assert spend_coin is not None
+        blocks, spend_coin = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
         spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin, additional_outputs=[(receiver_puzzlehash, 1000)]
@@ -174,31 +242,20 @@ class TestBlockchainTransactions:
         )
 
         next_block = new_blocks[-1]
-        await _validate_and_add_block(full_node_1.blockchain, next_block, expected_error=Err.DUPLICATE_OUTPUT)
+        await validate_and_add_block(full_node_1.blockchain, next_block, expected_error=Err.DUPLICATE_OUTPUT)
 
-    @pytest.mark.anyio
     async def test_validate_blockchain_with_reorg_double_spend(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        spend_block = blocks[2]
-
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
-        assert spend_coin is not None
+        full_node_api_1 = one_full_node
+        blocks, spend_coin = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_puzzlehash, spend_coin)
 
@@ -208,20 +265,19 @@ class TestBlockchainTransactions:
             guarantee_transaction_block=True,
             transaction_data=spend_bundle,
         )
-        # Move chain to height 10, with a spend at height 10
-        for block in blocks_spend:
-            await full_node_api_1.full_node.add_block(block)
 
         # Reorg at height 5, add up to and including height 12
         new_blocks = bt.get_consecutive_blocks(
             7,
             blocks[:6],
             farmer_reward_puzzle_hash=coinbase_puzzlehash,
-            guarantee_transaction_block=True,
             seed=b"another seed",
         )
 
-        for block in new_blocks:
+        # Move chain to height 10, with a spend at height 10, then reorg. Nothing
+        # is checked in between, so both are added in one go. blocks[:6] are
+        # already in the chain, only add the fork
+        for block in blocks_spend + new_blocks[6:]:
             await full_node_api_1.full_node.add_block(block)
 
         # Spend the same coin in the new reorg chain at height 13
@@ -233,7 +289,7 @@ class TestBlockchainTransactions:
             transaction_data=spend_bundle,
         )
 
-        await _validate_and_add_block(full_node_api_1.full_node.blockchain, new_blocks[-1])
+        await validate_and_add_block(full_node_api_1.full_node.blockchain, new_blocks[-1])
 
         # But can't spend it twice
         new_blocks_double = bt.get_consecutive_blocks(
@@ -244,7 +300,7 @@ class TestBlockchainTransactions:
             transaction_data=spend_bundle,
         )
 
-        await _validate_and_add_block(
+        await validate_and_add_block(
             full_node_api_1.full_node.blockchain, new_blocks_double[-1], expected_error=Err.DOUBLE_SPEND
         )
 
@@ -257,8 +313,7 @@ class TestBlockchainTransactions:
             transaction_data=spend_bundle,
             seed=b"spend at 12 is ok",
         )
-        for block in new_blocks_reorg:
-            await full_node_api_1.full_node.add_block(block)
+        await full_node_api_1.full_node.add_block(new_blocks_reorg[-1])
 
         # Spend at height 13 is also OK (same height)
         new_blocks_reorg = bt.get_consecutive_blocks(
@@ -269,8 +324,7 @@ class TestBlockchainTransactions:
             transaction_data=spend_bundle,
             seed=b"spend at 13 is ok",
         )
-        for block in new_blocks_reorg:
-            await full_node_api_1.full_node.add_block(block)
+        await full_node_api_1.full_node.add_block(new_blocks_reorg[-1])
 
         # Spend at height 14 is not OK (already spend)
         new_blocks_reorg = bt.get_consecutive_blocks(
@@ -282,12 +336,14 @@ class TestBlockchainTransactions:
             seed=b"spend at 14 is double spend",
         )
         with pytest.raises(ConsensusError):
-            for block in new_blocks_reorg:
-                await full_node_api_1.full_node.add_block(block)
+            await full_node_api_1.full_node.add_block(new_blocks_reorg[-1])
 
-    @pytest.mark.anyio
     async def test_validate_blockchain_spend_reorg_coin(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools], softfork_height: uint32
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
+        softfork_height: uint32,
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
@@ -295,22 +351,8 @@ class TestBlockchainTransactions:
         receiver_1_puzzlehash = WALLET_A_PUZZLE_HASHES[1]
         receiver_2_puzzlehash = WALLET_A_PUZZLE_HASHES[2]
         receiver_3_puzzlehash = WALLET_A_PUZZLE_HASHES[3]
-        full_node_api_1, _, _, _, bt = two_nodes
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        spend_block = blocks[2]
-
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
-
-        assert spend_coin
+        full_node_api_1 = one_full_node
+        blocks, spend_coin = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_1_puzzlehash, spend_coin)
 
         new_blocks = bt.get_consecutive_blocks(
@@ -324,16 +366,9 @@ class TestBlockchainTransactions:
 
         await full_node_api_1.full_node.add_block(new_blocks[-1])
 
-        coin_2 = None
-        for coin in run_and_get_removals_and_additions(
-            new_blocks[-1],
-            test_constants.MAX_BLOCK_COST_CLVM,
-            height=softfork_height,
-            constants=bt.constants,
-        )[1]:
-            if coin.puzzle_hash == receiver_1_puzzlehash:
-                coin_2 = coin
-                break
+        coin_2 = additions_by_ph(new_blocks[-1], height=softfork_height, constants=bt.constants).get(
+            receiver_1_puzzlehash
+        )
         assert coin_2 is not None
 
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_2_puzzlehash, coin_2)
@@ -348,16 +383,9 @@ class TestBlockchainTransactions:
         )
         await full_node_api_1.full_node.add_block(new_blocks[-1])
 
-        coin_3 = None
-        for coin in run_and_get_removals_and_additions(
-            new_blocks[-1],
-            test_constants.MAX_BLOCK_COST_CLVM,
-            height=softfork_height,
-            constants=bt.constants,
-        )[1]:
-            if coin.puzzle_hash == receiver_2_puzzlehash:
-                coin_3 = coin
-                break
+        coin_3 = additions_by_ph(new_blocks[-1], height=softfork_height, constants=bt.constants).get(
+            receiver_2_puzzlehash
+        )
         assert coin_3 is not None
 
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_3_puzzlehash, coin_3)
@@ -373,19 +401,18 @@ class TestBlockchainTransactions:
 
         await full_node_api_1.full_node.add_block(new_blocks[-1])
 
-    @pytest.mark.anyio
     async def test_validate_blockchain_spend_reorg_cb_coin(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 15
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_1_puzzlehash = WALLET_A_PUZZLE_HASHES[1]
-        full_node_api_1, _, _, _, bt = two_nodes
-        blocks = bt.get_consecutive_blocks(num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash)
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
+        full_node_api_1 = one_full_node
+        blocks, _ = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
         # Spends a coinbase created in reorg
         new_blocks = bt.get_consecutive_blocks(
@@ -396,14 +423,12 @@ class TestBlockchainTransactions:
             guarantee_transaction_block=True,
         )
 
-        for block in new_blocks:
+        # blocks[:6] are already in the chain, only add the fork
+        for block in new_blocks[6:]:
             await full_node_api_1.full_node.add_block(block)
 
         spend_block = new_blocks[-1]
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
+        spend_coin = reward_coin_by_puzzle_hash(spend_block, coinbase_puzzlehash)
         assert spend_coin is not None
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_1_puzzlehash, spend_coin)
 
@@ -418,28 +443,20 @@ class TestBlockchainTransactions:
 
         await full_node_api_1.full_node.add_block(new_blocks[-1])
 
-    @pytest.mark.anyio
     async def test_validate_blockchain_spend_reorg_since_genesis(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_1_puzzlehash = WALLET_A_PUZZLE_HASHES[1]
-        full_node_api_1, _, _, _, bt = two_nodes
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
+        full_node_api_1 = one_full_node
+        blocks, spend_coin = await add_prefarmed_blocks(
+            full_node_api_1.full_node, prefarmed_blocks, num_blocks, spend_index=-1
         )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        spend_block = blocks[-1]
-        spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
-        assert spend_coin is not None
         spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_1_puzzlehash, spend_coin)
 
         new_blocks = bt.get_consecutive_blocks(
@@ -469,43 +486,25 @@ class TestBlockchainTransactions:
 
         await full_node_api_1.full_node.add_block(new_blocks[-1])
 
-    @pytest.mark.anyio
     async def test_assert_my_coin_id(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
         # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
+        blocks, spend_coin = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
         # Coinbase that gets spent
-
-        spend_block = blocks[2]
-        bad_block = blocks[3]
-        spend_coin = None
-        bad_spend_coin = None
-        for coin in spend_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin = coin
-        assert spend_coin is not None
-        for coin in bad_block.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                bad_spend_coin = coin
+        bad_spend_coin = reward_coin_by_puzzle_hash(blocks[3], coinbase_puzzlehash)
         assert bad_spend_coin is not None
-        valid_cvp = ConditionWithArgs(ConditionOpcode.ASSERT_MY_COIN_ID, [spend_coin.name()])
-        valid_dic = {valid_cvp.opcode: [valid_cvp]}
-        bad_cvp = ConditionWithArgs(ConditionOpcode.ASSERT_MY_COIN_ID, [bad_spend_coin.name()])
-
-        bad_dic = {bad_cvp.opcode: [bad_cvp]}
+        valid_dic = ConditionsBuilder().add(ConditionOpcode.ASSERT_MY_COIN_ID, [spend_coin.name()]).to_dict()
+        bad_dic = ConditionsBuilder().add(ConditionOpcode.ASSERT_MY_COIN_ID, [bad_spend_coin.name()]).to_dict()
         bad_spend_bundle = wallet_a.generate_signed_transaction(uint64(1000), receiver_puzzlehash, spend_coin, bad_dic)
 
         valid_spend_bundle = wallet_a.generate_signed_transaction(
@@ -526,7 +525,7 @@ class TestBlockchainTransactions:
         )
 
         # Try to validate that block
-        await _validate_and_add_block(
+        await validate_and_add_block(
             full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.ASSERT_MY_COIN_ID_FAILED
         )
 
@@ -539,57 +538,36 @@ class TestBlockchainTransactions:
             transaction_data=valid_spend_bundle,
             guarantee_transaction_block=True,
         )
-        await _validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
+        await validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
 
-    @pytest.mark.anyio
     async def test_assert_coin_announcement_consumed(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
         # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
+        blocks, spend_coin_block_1 = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
         # Coinbase that gets spent
-        block1 = blocks[2]
-        block2 = blocks[3]
-
-        spend_coin_block_1 = None
-        spend_coin_block_2 = None
-        for coin in block1.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_1 = coin
-        assert spend_coin_block_1 is not None
-        for coin in block2.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_2 = coin
+        spend_coin_block_2 = reward_coin_by_puzzle_hash(blocks[3], coinbase_puzzlehash)
         assert spend_coin_block_2 is not None
 
         # This condition requires block2 coinbase to be spent
-        block1_cvp = ConditionWithArgs(
-            ConditionOpcode.ASSERT_COIN_ANNOUNCEMENT,
-            [AssertCoinAnnouncement(asserted_id=spend_coin_block_2.name(), asserted_msg=b"test").msg_calc],
-        )
-        block1_dic = {block1_cvp.opcode: [block1_cvp]}
+        announcement = AssertCoinAnnouncement(asserted_id=spend_coin_block_2.name(), asserted_msg=b"test")
+        block1_conditions = ConditionsBuilder().add(ConditionOpcode.ASSERT_COIN_ANNOUNCEMENT, [announcement.msg_calc])
+        block1_dic = block1_conditions.to_dict()
         block1_spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic
         )
 
         # This condition requires block1 coinbase to be spent
-        block2_cvp = ConditionWithArgs(
-            ConditionOpcode.CREATE_COIN_ANNOUNCEMENT,
-            [b"test"],
-        )
-        block2_dic = {block2_cvp.opcode: [block2_cvp]}
+        block2_dic = CREATE_COIN_ANNOUNCEMENT_TEST.to_dict()
         block2_spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin_block_2, block2_dic
         )
@@ -606,12 +584,12 @@ class TestBlockchainTransactions:
         )
 
         # Try to validate that block
-        await _validate_and_add_block(
+        await validate_and_add_block(
             full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.ASSERT_ANNOUNCE_CONSUMED_FAILED
         )
 
         # bundle_together contains both transactions
-        bundle_together = SpendBundle.aggregate([block1_spend_bundle, block2_spend_bundle])
+        bundle_together = SpendBundle.aggregate((block1_spend_bundle, block2_spend_bundle))
 
         # Create another block that includes our transaction
         new_blocks = bt.get_consecutive_blocks(
@@ -623,57 +601,36 @@ class TestBlockchainTransactions:
         )
 
         # Try to validate newly created block
-        await _validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
+        await validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
 
-    @pytest.mark.anyio
     async def test_assert_puzzle_announcement_consumed(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
         # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
+        blocks, spend_coin_block_1 = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
         # Coinbase that gets spent
-        block1 = blocks[2]
-        block2 = blocks[3]
-
-        spend_coin_block_1 = None
-        spend_coin_block_2 = None
-        for coin in block1.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_1 = coin
-        assert spend_coin_block_1 is not None
-        for coin in block2.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_2 = coin
+        spend_coin_block_2 = reward_coin_by_puzzle_hash(blocks[3], coinbase_puzzlehash)
         assert spend_coin_block_2 is not None
 
         # This condition requires block2 coinbase to be spent
-        block1_cvp = ConditionWithArgs(
-            ConditionOpcode.ASSERT_PUZZLE_ANNOUNCEMENT,
-            [AssertPuzzleAnnouncement(asserted_ph=spend_coin_block_2.puzzle_hash, asserted_msg=b"test").msg_calc],
-        )
-        block1_dic = {block1_cvp.opcode: [block1_cvp]}
+        announcement = AssertPuzzleAnnouncement(asserted_ph=spend_coin_block_2.puzzle_hash, asserted_msg=b"test")
+        block1_conditions = ConditionsBuilder().add(ConditionOpcode.ASSERT_PUZZLE_ANNOUNCEMENT, [announcement.msg_calc])
+        block1_dic = block1_conditions.to_dict()
         block1_spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic
         )
 
         # This condition requires block1 coinbase to be spent
-        block2_cvp = ConditionWithArgs(
-            ConditionOpcode.CREATE_PUZZLE_ANNOUNCEMENT,
-            [b"test"],
-        )
-        block2_dic = {block2_cvp.opcode: [block2_cvp]}
+        block2_dic = CREATE_PUZZLE_ANNOUNCEMENT_TEST.to_dict()
         block2_spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin_block_2, block2_dic
         )
@@ -690,12 +647,12 @@ class TestBlockchainTransactions:
         )
 
         # Try to validate that block
-        await _validate_and_add_block(
+        await validate_and_add_block(
             full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.ASSERT_ANNOUNCE_CONSUMED_FAILED
         )
 
         # bundle_together contains both transactions
-        bundle_together = SpendBundle.aggregate([block1_spend_bundle, block2_spend_bundle])
+        bundle_together = SpendBundle.aggregate((block1_spend_bundle, block2_spend_bundle))
 
         # Create another block that includes our transaction
         new_blocks = bt.get_consecutive_blocks(
@@ -707,105 +664,36 @@ class TestBlockchainTransactions:
         )
 
         # Try to validate newly created block
-        await _validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
-
-    @pytest.mark.anyio
-    async def test_assert_height_absolute(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
-    ) -> None:
-        num_blocks = 10
-        wallet_a = WALLET_A
-        coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
-        receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
-        full_node_1 = full_node_api_1.full_node
-        # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        # Coinbase that gets spent
-        block1 = blocks[2]
-        spend_coin_block_1 = None
-        for coin in block1.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_1 = coin
-        assert spend_coin_block_1 is not None
-
-        # This condition requires block1 coinbase to be spent after index 10
-        block1_cvp = ConditionWithArgs(ConditionOpcode.ASSERT_HEIGHT_ABSOLUTE, [int_to_bytes(10)])
-        block1_dic = {block1_cvp.opcode: [block1_cvp]}
-        block1_spend_bundle = wallet_a.generate_signed_transaction(
-            uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic
-        )
-
-        # program that will be sent too early
-        assert block1_spend_bundle is not None
-        invalid_new_blocks = bt.get_consecutive_blocks(
-            1,
-            blocks,
-            farmer_reward_puzzle_hash=coinbase_puzzlehash,
-            transaction_data=block1_spend_bundle,
-            guarantee_transaction_block=True,
-        )
-
-        # Try to validate that block at index 10
-        await _validate_and_add_block(
-            full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.ASSERT_HEIGHT_ABSOLUTE_FAILED
-        )
-
-        new_blocks = bt.get_consecutive_blocks(
-            1,
-            blocks,
-            farmer_reward_puzzle_hash=coinbase_puzzlehash,
-            guarantee_transaction_block=True,
-        )
-        await _validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
-
-        # At index 11, it can be spent
-        new_blocks = bt.get_consecutive_blocks(
-            1,
-            new_blocks,
-            farmer_reward_puzzle_hash=coinbase_puzzlehash,
-            transaction_data=block1_spend_bundle,
-            guarantee_transaction_block=True,
-        )
-        await _validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
-
-    @pytest.mark.anyio
-    async def test_assert_height_relative(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        await validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
+
+    @pytest.mark.parametrize(
+        "num_blocks, conditions, expected_error",
+        [
+            # This condition requires block1 coinbase to be spent after index 10
+            pytest.param(10, ASSERT_HEIGHT_ABSOLUTE_10, Err.ASSERT_HEIGHT_ABSOLUTE_FAILED, id="absolute"),
+            # This condition requires block1 coinbase to be spent more than 10 block after it was farmed
+            # block index has to be greater than (2 + 9 = 11)
+            pytest.param(11, ASSERT_HEIGHT_RELATIVE_9, Err.ASSERT_HEIGHT_RELATIVE_FAILED, id="relative"),
+        ],
+    )
+    async def test_assert_height(
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
+        num_blocks: int,
+        conditions: ConditionsBuilder,
+        expected_error: Err,
     ) -> None:
-        num_blocks = 11
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
         # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
+        blocks, spend_coin_block_1 = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        # Coinbase that gets spent
-        block1 = blocks[2]
-        spend_coin_block_1 = None
-        for coin in block1.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_1 = coin
-        assert spend_coin_block_1 is not None
-
-        # This condition requires block1 coinbase to be spent after index 11
-        # This condition requires block1 coinbase to be spent more than 10 block after it was farmed
-        # block index has to be greater than (2 + 9 = 11)
-        block1_cvp = ConditionWithArgs(ConditionOpcode.ASSERT_HEIGHT_RELATIVE, [int_to_bytes(9)])
-        block1_dic = {block1_cvp.opcode: [block1_cvp]}
+        block1_dic = conditions.to_dict()
         block1_spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic
         )
@@ -820,10 +708,8 @@ class TestBlockchainTransactions:
             guarantee_transaction_block=True,
         )
 
-        # Try to validate that block at index 11
-        await _validate_and_add_block(
-            full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.ASSERT_HEIGHT_RELATIVE_FAILED
-        )
+        # Try to validate that block at index num_blocks
+        await validate_and_add_block(full_node_1.blockchain, invalid_new_blocks[-1], expected_error=expected_error)
 
         new_blocks = bt.get_consecutive_blocks(
             1,
@@ -831,9 +717,8 @@ class TestBlockchainTransactions:
             farmer_reward_puzzle_hash=coinbase_puzzlehash,
             guarantee_transaction_block=True,
         )
-        await _validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
 
-        # At index 12, it can be spent
+        # At index num_blocks + 1, it can be spent
         new_blocks = bt.get_consecutive_blocks(
             1,
             new_blocks,
@@ -841,37 +726,25 @@ class TestBlockchainTransactions:
             transaction_data=block1_spend_bundle,
             guarantee_transaction_block=True,
         )
-        await _validate_and_add_block(full_node_1.blockchain, new_blocks[-1])
+        await validate_and_add_blocks(full_node_1.blockchain, new_blocks[-2:])
 
-    @pytest.mark.anyio
     async def test_assert_seconds_relative(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
         # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        # Coinbase that gets spent
-        block1 = blocks[2]
-        spend_coin_block_1 = None
-        for coin in block1.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_1 = coin
-        assert spend_coin_block_1 is not None
+        blocks, spend_coin_block_1 = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
         # This condition requires block1 coinbase to be spent 300 seconds after coin creation
-        block1_cvp = ConditionWithArgs(ConditionOpcode.ASSERT_SECONDS_RELATIVE, [int_to_bytes(300)])
-        block1_dic = {block1_cvp.opcode: [block1_cvp]}
+        block1_dic = ASSERT_SECONDS_RELATIVE_300.to_dict()
         block1_spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic
         )
@@ -888,7 +761,7 @@ class TestBlockchainTransactions:
         )
 
         # Try to validate that block before 300 sec
-        await _validate_and_add_block(
+        await validate_and_add_block(
             full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.ASSERT_SECONDS_RELATIVE_FAILED
         )
 
@@ -903,7 +776,6 @@ class TestBlockchainTransactions:
                 time_per_block=301,
             )
         )
-        await full_node_api_1.full_node.add_block(blocks[-1])
 
         valid_new_blocks = bt.get_consecutive_blocks(
             1,
@@ -913,39 +785,29 @@ class TestBlockchainTransactions:
             guarantee_transaction_block=True,
             time_per_block=301,
         )
-        await _validate_and_add_block(full_node_1.blockchain, valid_new_blocks[-1])
+        # the timestamp block and the spend are added as one batch
+        await validate_and_add_blocks(full_node_1.blockchain, valid_new_blocks[-2:])
 
-    @pytest.mark.anyio
     async def test_assert_seconds_absolute(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
         # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        # Coinbase that gets spent
-        block1 = blocks[2]
-        spend_coin_block_1 = None
-        for coin in block1.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_1 = coin
-        assert spend_coin_block_1 is not None
+        blocks, spend_coin_block_1 = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
         # This condition requires block1 coinbase to be spent after 30 seconds from now
         assert blocks[-1].foliage_transaction_block is not None
         current_time_plus3 = uint64(blocks[-1].foliage_transaction_block.timestamp + 30)
-        block1_cvp = ConditionWithArgs(ConditionOpcode.ASSERT_SECONDS_ABSOLUTE, [int_to_bytes(current_time_plus3)])
-        block1_dic = {block1_cvp.opcode: [block1_cvp]}
+        seconds = int_to_bytes(current_time_plus3)
+        block1_dic = ConditionsBuilder().add(ConditionOpcode.ASSERT_SECONDS_ABSOLUTE, [seconds]).to_dict()
         block1_spend_bundle = wallet_a.generate_signed_transaction(
             uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic
         )
@@ -962,7 +824,7 @@ class TestBlockchainTransactions:
         )
 
         # Try to validate that block before 30 sec
-        await _validate_and_add_block(
+        await validate_and_add_block(
             full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.ASSERT_SECONDS_ABSOLUTE_FAILED
         )
 
@@ -977,7 +839,6 @@ class TestBlockchainTransactions:
                 time_per_block=30,
             )
         )
-        await full_node_api_1.full_node.add_block(blocks[-1])
 
         valid_new_blocks = bt.get_consecutive_blocks(
             1,
@@ -987,47 +848,35 @@ class TestBlockchainTransactions:
             guarantee_transaction_block=True,
             time_per_block=31,
         )
-        await _validate_and_add_block(full_node_1.blockchain, valid_new_blocks[-1])
+        # the timestamp block and the spend are added as one batch
+        await validate_and_add_blocks(full_node_1.blockchain, valid_new_blocks[-2:])
 
-    @pytest.mark.anyio
     async def test_assert_fee_condition(
-        self, two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools]
+        self,
+        one_full_node: FullNodeAPI,
+        bt: BlockTools,
+        prefarmed_blocks: List[FullBlock],
     ) -> None:
         num_blocks = 10
         wallet_a = WALLET_A
         coinbase_puzzlehash = WALLET_A_PUZZLE_HASHES[0]
         receiver_puzzlehash = BURN_PUZZLE_HASH
-        full_node_api_1, _, _, _, bt = two_nodes
+        full_node_api_1 = one_full_node
         full_node_1 = full_node_api_1.full_node
         # Farm blocks
-        blocks = bt.get_consecutive_blocks(
-            num_blocks, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
-        )
-
-        for block in blocks:
-            await full_node_api_1.full_node.add_block(block)
-
-        # Coinbase that gets spent
-        block1 = blocks[2]
-        spend_coin_block_1 = None
-        for coin in block1.get_included_reward_coins():
-            if coin.puzzle_hash == coinbase_puzzlehash:
-                spend_coin_block_1 = coin
-        assert spend_coin_block_1 is not None
+        blocks, spend_coin_block_1 = await add_prefarmed_blocks(full_node_api_1.full_node, prefarmed_blocks, num_blocks)
 
         # This condition requires fee to be 10 mojo
-        cvp_fee = ConditionWithArgs(ConditionOpcode.RESERVE_FEE, [int_to_bytes(10)])
         # This spend bundle has 9 mojo as fee
-        block1_dic_bad = {cvp_fee.opcode: [cvp_fee]}
-        block1_dic_good = {cvp_fee.opcode: [cvp_fee]}
+        # Both bundles have the same conditions, only the fee differs. Every
+        # call still gets a dict of its own, since signing modifies it
+        block1_conditions = RESERVE_FEE_10
         block1_spend_bundle_bad = wallet_a.generate_signed_transaction(
-            uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic_bad, fee=9
+            uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_conditions.to_dict(), fee=9
         )
         block1_spend_bundle_good = wallet_a.generate_signed_transaction(
-            uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_dic_good, fee=10
+            uint64(1000), receiver_puzzlehash, spend_coin_block_1, block1_conditions.to_dict(), fee=10
         )
-        log.warning(block1_spend_bundle_good.additions())
-        log.warning(f"Spend bundle fees: {estimate_fees(block1_spend_bundle_good)}")
         invalid_new_blocks = bt.get_consecutive_blocks(
             1,
             blocks,
@@ -1036,7 +885,7 @@ class TestBlockchainTransactions:
             guarantee_transaction_block=True,
         )
 
-        await _validate_and_add_block(
+        await validate_and_add_block(
             full_node_1.blockchain, invalid_new_blocks[-1], expected_error=Err.RESERVE_FEE_CONDITION_FAILED
         )
 
@@ -1047,4 +896,4 @@ class TestBlockchainTransactions:
             transaction_data=block1_spend_bundle_good,
             guarantee_transaction_block=True,
         )
-        await _validate_and_add_block(full_node_1.blockchain, valid_new_blocks[-1])
+        await validate_and_add_block(full_node_1.blockchain, valid_new_blocks[-1])
@@ -576,6 +576,14 @@ async def node_with_params(request, blockchain_constants: ConsensusConstants) ->
         yield new.simulators[0].peer_api
 
 
+@pytest.fixture(scope="function")
+async def one_full_node(
+    db_version: int, self_hostname, blockchain_constants: ConsensusConstants
+) -> AsyncIterator[FullNodeAPI]:
+    async with setup_n_nodes(blockchain_constants, 1, db_version=db_version, self_hostname=self_hostname) as nodes:
+        yield nodes[0]
+
+
 @pytest.fixture(scope="function")
 async def two_nodes(db_version: int, self_hostname, blockchain_constants: ConsensusConstants):
     async with setup_two_nodes(blockchain_constants, db_version=db_version, self_hostname=self_hostname) as _:
@@ -19,9 +19,8 @@ from chia._tests.connection_utils import add_dummy_connection, connect_and_get_p
 from chia._tests.core.full_node.stores.test_coin_store import get_future_reward_coins
 from chia._tests.core.make_block_generator import make_spend_bundle
 from chia._tests.core.node_height import node_height_at_least
-from chia._tests.util.misc import wallet_height_at_least
 from chia._tests.util.setup_nodes import SimulatorsAndWalletsServices
-from chia._tests.util.time_out_assert import time_out_assert, time_out_assert_custom_interval, time_out_messages
+from chia._tests.util.time_out_assert import time_out_assert, time_out_assert_custom_interval, wait_for_messages
 from chia.consensus.block_body_validation import ForkInfo
 from chia.consensus.pot_iterations import is_overflow_block
 from chia.full_node.bundle_tools import detect_potential_template_generator
@@ -67,37 +66,39 @@ from chia.util.ints import uint8, uint16, uint32, uint64, uint128
 from chia.util.limited_semaphore import LimitedSemaphore
 from chia.util.recursive_replace import recursive_replace
 from chia.util.vdf_prover import get_vdf_info_and_proof
+from chia.wallet.transaction_record import TransactionRecord
 from chia.wallet.util.tx_config import DEFAULT_TX_CONFIG
 
+ANYONE_CAN_SPEND = Program.to(1)
+ANYONE_CAN_SPEND_PH = ANYONE_CAN_SPEND.get_tree_hash()
+
+
+async def transaction_requested_within(
+    incoming: asyncio.Queue, new_spend: full_node_protocol.NewTransaction, timeout: float
+) -> bool:
+    # returns as soon as the transaction is requested, rather than after
+    # sleeping through the whole timeout
+    # serialize the expected request once, instead of parsing every request
+    # that comes in
+    expected = bytes(full_node_protocol.RequestTransaction(new_spend.transaction_id))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            response = await asyncio.wait_for(incoming.get(), max(0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            return False
+        if isinstance(response, Message) and response.type == ProtocolMessageTypes.request_transaction.value:
+            if response.data == expected:
+                return True
+
 
 async def new_transaction_not_requested(incoming, new_spend):
-    await asyncio.sleep(3)
-    while not incoming.empty():
-        response = await incoming.get()
-        if (
-            response is not None
-            and isinstance(response, Message)
-            and response.type == ProtocolMessageTypes.request_transaction.value
-        ):
-            request = full_node_protocol.RequestTransaction.from_bytes(response.data)
-            if request.transaction_id == new_spend.transaction_id:
-                return False
-    return True
+    return not await transaction_requested_within(incoming, new_spend, 3)
 
 
 async def new_transaction_requested(incoming, new_spend):
-    await asyncio.sleep(1)
-    while not incoming.empty():
-        response = await incoming.get()
-        if (
-            response is not None
-            and isinstance(response, Message)
-            and response.type == ProtocolMessageTypes.request_transaction.value
-        ):
-            request = full_node_protocol.RequestTransaction.from_bytes(response.data)
-            if request.transaction_id == new_spend.transaction_id:
-                return True
-    return False
+    return await transaction_requested_within(incoming, new_spend, 1)
 
 
 async def get_block_path(full_node: FullNodeAPI):
@@ -125,33 +126,24 @@ async def test_sync_no_farmer(
 
     blocks = default_1000_blocks
 
-    # full node 1 has the complete chain
-    for block_batch in to_batches(blocks, 64):
-        success, change, err = await full_node_1.full_node.add_block_batch(
-            block_batch.entries, PeerInfo("0.0.0.0", 8884), None
-        )
-        assert err is None
-        assert success is True
+    async def add_blocks(full_node: FullNodeAPI, chain: List[FullBlock]) -> None:
+        for block_batch in to_batches(chain, 64):
+            success, change, err = await full_node.full_node.add_block_batch(
+                block_batch.entries, PeerInfo("0.0.0.0", 8884), None
+            )
+            assert err is None
+            assert success is True
 
-    target_peak = full_node_1.full_node.blockchain.get_peak()
+    # full node 1 has the complete chain, full node 2 is behind by 800 blocks.
+    # The nodes have separate blockchains, so they can be filled in concurrently
+    await asyncio.gather(add_blocks(full_node_1, blocks), add_blocks(full_node_2, blocks[:-800]))
 
-    # full node 2 is behind by 800 blocks
-    for block_batch in to_batches(blocks[:-800], 64):
-        success, change, err = await full_node_2.full_node.add_block_batch(
-            block_batch.entries, PeerInfo("0.0.0.0", 8884), None
-        )
-        assert err is None
-        assert success is True
+    target_peak = full_node_1.full_node.blockchain.get_peak()
 
     # connect the nodes and wait for node 2 to sync up to node 1
     await connect_and_get_peer(server_1, server_2, self_hostname)
 
-    def check_nodes_in_sync():
-        p1 = full_node_2.full_node.blockchain.get_peak()
-        p2 = full_node_1.full_node.blockchain.get_peak()
-        return p1 == p2
-
-    await time_out_assert(120, check_nodes_in_sync)
+    await full_node_2.wait_for_peak_height(target_peak.height, timeout=120)
 
     assert full_node_1.full_node.blockchain.get_peak() == target_peak
     assert full_node_2.full_node.blockchain.get_peak() == target_peak
@@ -179,34 +171,46 @@ class TestFullNodeBlockCompression:
 
         ph = await wallet.get_new_puzzlehash()
 
-        for i in range(4):
-            await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
+        async def wait_for_height(height: int, timeout: float) -> None:
+            await full_node_1.wait_for_peak_height(uint32(height), timeout=timeout)
+            await full_node_2.wait_for_peak_height(uint32(height), timeout=timeout)
+            # the wallet is synced once it has caught up to the full node's peak,
+            # which also covers it having reached this height
+            await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
+
+        async def send_and_wait(amount: int) -> TransactionRecord:
+            [tr] = await wallet.generate_signed_transaction(amount, ph, DEFAULT_TX_CONFIG)
+            [tr] = await wallet.wallet_state_manager.add_pending_transactions([tr])
+            await full_node_2.wait_transaction_records_entered_mempool([tr], timeout=10)
+            return tr
+
+        # the same genesis and 4 transaction blocks farm_new_transaction_block() would make,
+        # but generated up front rather than going through a farming cycle for each one
+        warmup = full_node_1.bt.get_consecutive_blocks(1)
+        warmup = full_node_1.bt.get_consecutive_blocks(
+            4,
+            block_list_input=warmup,
+            farmer_reward_puzzle_hash=ph,
+            pool_reward_puzzle_hash=ph,
+            guarantee_transaction_block=True,
+            time_per_block=full_node_1.time_per_block,
+            current_time=full_node_1.use_current_time,
+        )
+        success, _, err = await full_node_1.full_node.add_block_batch(warmup[:-1], PeerInfo("0.0.0.0", 0), None)
+        assert err is None
+        assert success is True
+        # adding the last one on its own updates the peak and lets the other node and the
+        # wallet know about it
+        await full_node_1.full_node.add_block(warmup[-1])
 
-        await time_out_assert(30, wallet_height_at_least, True, wallet_node_1, 4)
-        await time_out_assert(30, node_height_at_least, True, full_node_1, 4)
-        await time_out_assert(30, node_height_at_least, True, full_node_2, 4)
-        await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
+        await wait_for_height(4, timeout=30)
 
         # Send a transaction to mempool
-        [tr] = await wallet.generate_signed_transaction(
-            tx_size,
-            ph,
-            DEFAULT_TX_CONFIG,
-        )
-        [tr] = await wallet.wallet_state_manager.add_pending_transactions([tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            tr.spend_bundle,
-            tr.name,
-        )
+        tr = await send_and_wait(tx_size)
 
         # Farm a block
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
-        await time_out_assert(30, node_height_at_least, True, full_node_1, 5)
-        await time_out_assert(30, node_height_at_least, True, full_node_2, 5)
-        await time_out_assert(30, wallet_height_at_least, True, wallet_node_1, 5)
-        await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
+        await wait_for_height(5, timeout=30)
 
         async def check_transaction_confirmed(transaction) -> bool:
             tx = await wallet_node_1.wallet_state_manager.get_transaction(transaction.name)
@@ -215,7 +219,8 @@ class TestFullNodeBlockCompression:
         await time_out_assert(30, check_transaction_confirmed, True, tr)
 
         # Confirm generator is not compressed
-        program: Optional[SerializedProgram] = (await full_node_1.get_all_full_blocks())[-1].transactions_generator
+        last_block = (await full_node_1.get_all_full_blocks())[-1]
+        program: Optional[SerializedProgram] = last_block.transactions_generator
         assert program is not None
         template = detect_potential_template_generator(uint32(5), program)
         if consensus_mode >= ConsensusMode.HARD_FORK_2_0:
@@ -224,36 +229,23 @@ class TestFullNodeBlockCompression:
             assert template is None
         else:
             assert template is not None
-        assert len((await full_node_1.get_all_full_blocks())[-1].transactions_generator_ref_list) == 0
+        assert len(last_block.transactions_generator_ref_list) == 0
 
         # Send another tx
-        [tr] = await wallet.generate_signed_transaction(
-            20000,
-            ph,
-            DEFAULT_TX_CONFIG,
-        )
-        [tr] = await wallet.wallet_state_manager.add_pending_transactions([tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            tr.spend_bundle,
-            tr.name,
-        )
+        tr = await send_and_wait(20000)
 
         # Farm a block
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
-        await time_out_assert(10, node_height_at_least, True, full_node_1, 6)
-        await time_out_assert(10, node_height_at_least, True, full_node_2, 6)
-        await time_out_assert(10, wallet_height_at_least, True, wallet_node_1, 6)
-        await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
+        await wait_for_height(6, timeout=10)
 
         await time_out_assert(10, check_transaction_confirmed, True, tr)
 
         # Confirm generator is compressed
-        program: Optional[SerializedProgram] = (await full_node_1.get_all_full_blocks())[-1].transactions_generator
+        last_block = (await full_node_1.get_all_full_blocks())[-1]
+        program: Optional[SerializedProgram] = last_block.transactions_generator
         assert program is not None
         assert detect_potential_template_generator(uint32(6), program) is None
-        num_blocks = len((await full_node_1.get_all_full_blocks())[-1].transactions_generator_ref_list)
+        num_blocks = len(last_block.transactions_generator_ref_list)
         if consensus_mode >= ConsensusMode.HARD_FORK_2_0:
             # after the hard fork we don't use this compression mechanism
             # anymore, we use CLVM backrefs in the encoding instead
@@ -264,77 +256,24 @@ class TestFullNodeBlockCompression:
         # Farm two empty blocks
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
-        await time_out_assert(10, node_height_at_least, True, full_node_1, 8)
-        await time_out_assert(10, node_height_at_least, True, full_node_2, 8)
-        await time_out_assert(10, wallet_height_at_least, True, wallet_node_1, 8)
-        await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
-
-        # Send another 2 tx
-        [tr] = await wallet.generate_signed_transaction(
-            30000,
-            ph,
-            DEFAULT_TX_CONFIG,
-        )
-        [tr] = await wallet.wallet_state_manager.add_pending_transactions([tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            tr.spend_bundle,
-            tr.name,
-        )
-        [tr] = await wallet.generate_signed_transaction(
-            40000,
-            ph,
-            DEFAULT_TX_CONFIG,
-        )
-        [tr] = await wallet.wallet_state_manager.add_pending_transactions([tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            tr.spend_bundle,
-            tr.name,
-        )
-
-        [tr] = await wallet.generate_signed_transaction(
-            50000,
-            ph,
-            DEFAULT_TX_CONFIG,
-        )
-        [tr] = await wallet.wallet_state_manager.add_pending_transactions([tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            tr.spend_bundle,
-            tr.name,
-        )
+        await wait_for_height(8, timeout=10)
 
-        [tr] = await wallet.generate_signed_transaction(
-            3000000000000,
-            ph,
-            DEFAULT_TX_CONFIG,
-        )
-        [tr] = await wallet.wallet_state_manager.add_pending_transactions([tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            tr.spend_bundle,
-            tr.name,
-        )
+        # Send another 4 tx
+        for amount in (30000, 40000, 50000, 3000000000000):
+            tr = await send_and_wait(amount)
 
         # Farm a block
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
-        await time_out_assert(10, node_height_at_least, True, full_node_1, 9)
-        await time_out_assert(10, node_height_at_least, True, full_node_2, 9)
-        await time_out_assert(10, wallet_height_at_least, True, wallet_node_1, 9)
-        await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
+        await wait_for_height(9, timeout=10)
 
         await time_out_assert(10, check_transaction_confirmed, True, tr)
 
         # Confirm generator is compressed
-        program: Optional[SerializedProgram] = (await full_node_1.get_all_full_blocks())[-1].transactions_generator
+        last_block = (await full_node_1.get_all_full_blocks())[-1]
+        program: Optional[SerializedProgram] = last_block.transactions_generator
         assert program is not None
         assert detect_potential_template_generator(uint32(9), program) is None
-        num_blocks = len((await full_node_1.get_all_full_blocks())[-1].transactions_generator_ref_list)
+        num_blocks = len(last_block.transactions_generator_ref_list)
         if consensus_mode >= ConsensusMode.HARD_FORK_2_0:
             # after the hard fork we don't use this compression mechanism
             # anymore, we use CLVM backrefs in the encoding instead
@@ -342,43 +281,34 @@ class TestFullNodeBlockCompression:
         else:
             assert num_blocks > 0
 
+        # both anyone-can-spend transactions below pay the same amount back to the wallet
+        anyone_can_spend_solution = Program.to([[ConditionOpcode.CREATE_COIN, ph, 30000]])
+
+        async def send_anyone_can_spend_and_wait() -> TransactionRecord:
+            # a standard transaction creating an anyone-can-spend coin, which
+            # is spent again in the same spend bundle
+            [tr] = await wallet.generate_signed_transaction(30000, ANYONE_CAN_SPEND_PH, DEFAULT_TX_CONFIG)
+            coin = {coin.puzzle_hash: coin for coin in tr.additions}[ANYONE_CAN_SPEND_PH]
+            extra_spend = SpendBundle([make_spend(coin, ANYONE_CAN_SPEND, anyone_can_spend_solution)], G2Element())
+            new_spend_bundle = SpendBundle.aggregate([tr.spend_bundle, extra_spend])
+            # the wallet already ran the standard spend for tr's additions, only
+            # the anyone-can-spend one has to be run
+            new_tr = dataclasses.replace(
+                tr,
+                spend_bundle=new_spend_bundle,
+                additions=tr.additions + extra_spend.additions(),
+                removals=tr.removals + extra_spend.removals(),
+            )
+            [new_tr] = await wallet.wallet_state_manager.add_pending_transactions([new_tr])
+            await full_node_2.wait_transaction_records_entered_mempool([new_tr], timeout=10)
+            return new_tr
+
         # Creates a standard_transaction and an anyone-can-spend tx
-        [tr] = await wallet.generate_signed_transaction(
-            30000,
-            Program.to(1).get_tree_hash(),
-            DEFAULT_TX_CONFIG,
-        )
-        extra_spend = SpendBundle(
-            [
-                make_spend(
-                    next(coin for coin in tr.additions if coin.puzzle_hash == Program.to(1).get_tree_hash()),
-                    Program.to(1),
-                    Program.to([[51, ph, 30000]]),
-                )
-            ],
-            G2Element(),
-        )
-        new_spend_bundle = SpendBundle.aggregate([tr.spend_bundle, extra_spend])
-        new_tr = dataclasses.replace(
-            tr,
-            spend_bundle=new_spend_bundle,
-            additions=new_spend_bundle.additions(),
-            removals=new_spend_bundle.removals(),
-        )
-        [new_tr] = await wallet.wallet_state_manager.add_pending_transactions([new_tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            new_tr.spend_bundle,
-            new_tr.spend_bundle.name(),
-        )
+        new_tr = await send_anyone_can_spend_and_wait()
 
         # Farm a block
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
-        await time_out_assert(10, node_height_at_least, True, full_node_1, 10)
-        await time_out_assert(10, node_height_at_least, True, full_node_2, 10)
-        await time_out_assert(10, wallet_height_at_least, True, wallet_node_1, 10)
-        await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
+        await wait_for_height(10, timeout=10)
 
         await time_out_assert(10, check_transaction_confirmed, True, new_tr)
 
@@ -389,45 +319,15 @@ class TestFullNodeBlockCompression:
         assert len(all_blocks[-1].transactions_generator_ref_list) == 0
 
         # Make a standard transaction and an anyone-can-spend transaction
-        [tr] = await wallet.generate_signed_transaction(
-            30000,
-            Program.to(1).get_tree_hash(),
-            DEFAULT_TX_CONFIG,
-        )
-        extra_spend = SpendBundle(
-            [
-                make_spend(
-                    next(coin for coin in tr.additions if coin.puzzle_hash == Program.to(1).get_tree_hash()),
-                    Program.to(1),
-                    Program.to([[51, ph, 30000]]),
-                )
-            ],
-            G2Element(),
-        )
-        new_spend_bundle = SpendBundle.aggregate([tr.spend_bundle, extra_spend])
-        new_tr = dataclasses.replace(
-            tr,
-            spend_bundle=new_spend_bundle,
-            additions=new_spend_bundle.additions(),
-            removals=new_spend_bundle.removals(),
-        )
-        [new_tr] = await wallet.wallet_state_manager.add_pending_transactions([new_tr])
-        await time_out_assert(
-            10,
-            full_node_2.full_node.mempool_manager.get_spendbundle,
-            new_tr.spend_bundle,
-            new_tr.spend_bundle.name(),
-        )
+        new_tr = await send_anyone_can_spend_and_wait()
 
         # Farm a block
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(ph))
-        await time_out_assert(10, node_height_at_least, True, full_node_1, 11)
-        await time_out_assert(10, node_height_at_least, True, full_node_2, 11)
-        await time_out_assert(10, wallet_height_at_least, True, wallet_node_1, 11)
-        await full_node_1.wait_for_wallet_synced(wallet_node=wallet_node_1, timeout=30)
+        await wait_for_height(11, timeout=10)
 
         # Confirm generator is not compressed
-        program: Optional[SerializedProgram] = (await full_node_1.get_all_full_blocks())[-1].transactions_generator
+        last_block = (await full_node_1.get_all_full_blocks())[-1]
+        program: Optional[SerializedProgram] = last_block.transactions_generator
         assert program is not None
         template = detect_potential_template_generator(uint32(11), program)
         if consensus_mode >= ConsensusMode.HARD_FORK_2_0:
@@ -436,7 +336,7 @@ class TestFullNodeBlockCompression:
             assert template is None
         else:
             assert template is not None
-        assert len((await full_node_1.get_all_full_blocks())[-1].transactions_generator_ref_list) == 0
+        assert len(last_block.transactions_generator_ref_list) == 0
 
         height = full_node_1.full_node.blockchain.get_peak().height
 
@@ -451,31 +351,34 @@ class TestFullNodeBlockCompression:
             assert template is None
         else:
             assert template is not None
+
+        async def assert_blocks_pre_validate() -> None:
+            # every shorter prefix of the blocks is covered by the longest one,
+            # so each block is only validated once per batch size. The
+            # pre-validations run one after another, since each of them
+            # temporarily adds block records to the shared blockchain
+            for batch_size in range(1, height, 3):
+                results = await blockchain.pre_validate_blocks_multiprocessing(
+                    all_blocks[: height - 1], {}, batch_size, validate_signatures=False
+                )
+                assert results is not None
+                for result in results:
+                    assert result.error is None
+
         if test_reorgs:
             reog_blocks = bt.get_consecutive_blocks(14)
             for r in range(0, len(reog_blocks), 3):
-                for reorg_block in reog_blocks[:r]:
+                # the blocks before r - 3 were added in the previous iteration
+                for reorg_block in reog_blocks[max(0, r - 3) : r]:
                     await _validate_and_add_block_no_error(blockchain, reorg_block)
-                for i in range(1, height):
-                    for batch_size in range(1, height, 3):
-                        results = await blockchain.pre_validate_blocks_multiprocessing(
-                            all_blocks[:i], {}, batch_size, validate_signatures=False
-                        )
-                        assert results is not None
-                        for result in results:
-                            assert result.error is None
+                await assert_blocks_pre_validate()
 
-            for r in range(0, len(all_blocks), 3):
-                for block in all_blocks[:r]:
+            # at r = 0 nothing is added, and the chain is the same one the last
+            # step of the loop above already checked against
+            for r in range(3, len(all_blocks), 3):
+                for block in all_blocks[max(0, r - 3) : r]:
                     await _validate_and_add_block_no_error(blockchain, block)
-                for i in range(1, height):
-                    for batch_size in range(1, height, 3):
-                        results = await blockchain.pre_validate_blocks_multiprocessing(
-                            all_blocks[:i], {}, batch_size, validate_signatures=False
-                        )
-                        assert results is not None
-                        for result in results:
-                            assert result.error is None
+                await assert_blocks_pre_validate()
 
             # Test revert previous_generator
             for block in reog_blocks:
@@ -496,10 +399,14 @@ class TestFullNodeProtocol:
         server_1 = nodes[0].full_node.server
         server_1.config["target_peer_count"] = 2
         server_1.config["target_outbound_peer_count"] = 0
-        for i in range(1, 4):
-            full_node_i = nodes[i]
-            server_i = full_node_i.full_node.server
-            await server_i.start_client(PeerInfo(self_hostname, server_1.get_port()))
+        # the inbound limit is checked and the connection recorded without
+        # yielding in between, so it holds even when the peers connect at once
+        await asyncio.gather(
+            *(
+                full_node_i.full_node.server.start_client(PeerInfo(self_hostname, server_1.get_port()))
+                for full_node_i in nodes[1:4]
+            )
+        )
         assert len(server_1.get_connections(NodeType.FULL_NODE)) == 2
 
     @pytest.mark.anyio
@@ -531,13 +438,13 @@ class TestFullNodeProtocol:
         expected_requests = 0
         if await full_node_1.full_node.synced():
             expected_requests = 1
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_mempool_transactions", expected_requests))
+        await wait_for_messages(10, incoming_queue, "request_mempool_transactions", expected_requests)
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
         blocks = bt.get_consecutive_blocks(1)
         for block in blocks[:1]:
             await full_node_1.full_node.add_block(block, peer)
 
-        await time_out_assert(10, time_out_messages(incoming_queue, "new_peak", 1))
+        await wait_for_messages(10, incoming_queue, "new_peak", 1)
 
         assert full_node_1.full_node.blockchain.get_peak().height == 0
 
@@ -554,33 +461,27 @@ class TestFullNodeProtocol:
         expected_requests = 0
         if await full_node_1.full_node.synced():
             expected_requests = 1
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_mempool_transactions", expected_requests))
+        await wait_for_messages(10, incoming_queue, "request_mempool_transactions", expected_requests)
 
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
 
         # Create empty slots
         blocks = await full_node_1.get_all_full_blocks()
         blocks = bt.get_consecutive_blocks(1, block_list_input=blocks, skip_slots=6)
+        finished_sub_slots = blocks[-1].finished_sub_slots
 
         # Add empty slots successful
-        for slot in blocks[-1].finished_sub_slots[:-2]:
+        for slot in finished_sub_slots[:-2]:
             await full_node_1.respond_end_of_sub_slot(fnp.RespondEndOfSubSlot(slot), peer)
-        num_sub_slots_added = len(blocks[-1].finished_sub_slots[:-2])
-        await time_out_assert(
-            10,
-            time_out_messages(
-                incoming_queue,
-                "new_signage_point_or_end_of_sub_slot",
-                num_sub_slots_added,
-            ),
-        )
+        num_sub_slots_added = len(finished_sub_slots) - 2
+        await wait_for_messages(10, incoming_queue, "new_signage_point_or_end_of_sub_slot", num_sub_slots_added)
         # Already have sub slot
-        await full_node_1.respond_end_of_sub_slot(fnp.RespondEndOfSubSlot(blocks[-1].finished_sub_slots[-3]), peer)
+        await full_node_1.respond_end_of_sub_slot(fnp.RespondEndOfSubSlot(finished_sub_slots[-3]), peer)
         await asyncio.sleep(2)
         assert incoming_queue.qsize() == 0
 
         # Add empty slots unsuccessful
-        await full_node_1.respond_end_of_sub_slot(fnp.RespondEndOfSubSlot(blocks[-1].finished_sub_slots[-1]), peer)
+        await full_node_1.respond_end_of_sub_slot(fnp.RespondEndOfSubSlot(finished_sub_slots[-1]), peer)
         await asyncio.sleep(2)
         assert incoming_queue.qsize() == 0
 
@@ -588,21 +489,15 @@ class TestFullNodeProtocol:
         blocks = bt.get_consecutive_blocks(4, block_list_input=blocks)
         for block in blocks[-5:]:
             await full_node_1.full_node.add_block(block, peer)
-        await time_out_assert(10, time_out_messages(incoming_queue, "new_peak", 5))
+        await wait_for_messages(10, incoming_queue, "new_peak", 5)
         blocks = bt.get_consecutive_blocks(1, skip_slots=2, block_list_input=blocks)
+        finished_sub_slots = blocks[-1].finished_sub_slots
 
         # Add empty slots successful
-        for slot in blocks[-1].finished_sub_slots:
+        for slot in finished_sub_slots:
             await full_node_1.respond_end_of_sub_slot(fnp.RespondEndOfSubSlot(slot), peer)
-        num_sub_slots_added = len(blocks[-1].finished_sub_slots)
-        await time_out_assert(
-            10,
-            time_out_messages(
-                incoming_queue,
-                "new_signage_point_or_end_of_sub_slot",
-                num_sub_slots_added,
-            ),
-        )
+        num_sub_slots_added = len(finished_sub_slots)
+        await wait_for_messages(10, incoming_queue, "new_signage_point_or_end_of_sub_slot", num_sub_slots_added)
 
     @pytest.mark.anyio
     async def test_respond_end_of_sub_slot_no_reorg(self, wallet_nodes, self_hostname):
@@ -612,7 +507,7 @@ class TestFullNodeProtocol:
         expected_requests = 0
         if await full_node_1.full_node.synced():
             expected_requests = 1
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_mempool_transactions", expected_requests))
+        await wait_for_messages(10, incoming_queue, "request_mempool_transactions", expected_requests)
 
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
 
@@ -649,7 +544,7 @@ class TestFullNodeProtocol:
         expected_requests = 0
         if await full_node_1.full_node.synced():
             expected_requests = 1
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_mempool_transactions", expected_requests))
+        await wait_for_messages(10, incoming_queue, "request_mempool_transactions", expected_requests)
 
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
 
@@ -679,7 +574,7 @@ class TestFullNodeProtocol:
         expected_requests = 0
         if await full_node_1.full_node.synced():
             expected_requests = 1
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_mempool_transactions", expected_requests))
+        await wait_for_messages(10, incoming_queue, "request_mempool_transactions", expected_requests)
 
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
         blocks = await full_node_1.get_all_full_blocks()
@@ -784,7 +679,7 @@ class TestFullNodeProtocol:
         expected_requests = 0
         if await full_node_1.full_node.synced():
             expected_requests = 1
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_mempool_transactions", expected_requests))
+        await wait_for_messages(10, incoming_queue, "request_mempool_transactions", expected_requests)
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
 
         blocks = await full_node_1.get_all_full_blocks()
@@ -800,13 +695,13 @@ class TestFullNodeProtocol:
                 block.reward_chain_block.get_unfinished().get_hash(),
             )
             task_1 = asyncio.create_task(full_node_1.new_peak(new_peak, dummy_peer))
-            await time_out_assert(10, time_out_messages(incoming_queue, "request_block", 1))
+            await wait_for_messages(10, incoming_queue, "request_block", 1)
             task_1.cancel()
 
             await full_node_1.full_node.add_block(block, peer)
             # Ignores, already have
             task_2 = asyncio.create_task(full_node_1.new_peak(new_peak, dummy_peer))
-            await time_out_assert(10, time_out_messages(incoming_queue, "request_block", 0))
+            await wait_for_messages(10, incoming_queue, "request_block", 0)
             task_2.cancel()
 
         async def suppress_value_error(coro: Coroutine) -> None:
@@ -822,7 +717,7 @@ class TestFullNodeProtocol:
             blocks_reorg[-2].reward_chain_block.get_unfinished().get_hash(),
         )
         asyncio.create_task(suppress_value_error(full_node_1.new_peak(new_peak, dummy_peer)))
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_block", 0))
+        await wait_for_messages(10, incoming_queue, "request_block", 0)
 
         # Does not ignore equal weight
         new_peak = fnp.NewPeak(
@@ -833,7 +728,7 @@ class TestFullNodeProtocol:
             blocks_reorg[-1].reward_chain_block.get_unfinished().get_hash(),
         )
         asyncio.create_task(suppress_value_error(full_node_1.new_peak(new_peak, dummy_peer)))
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_block", 1))
+        await wait_for_messages(10, incoming_queue, "request_block", 1)
 
     @pytest.mark.anyio
     async def test_new_transaction_and_mempool(self, wallet_nodes, self_hostname, seeded_random: random.Random):
@@ -856,17 +751,17 @@ class TestFullNodeProtocol:
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
         incoming_queue, node_id = await add_dummy_connection(server_1, self_hostname, 12312)
         fake_peer = server_1.all_connections[node_id]
-        puzzle_hashes = []
 
         # Makes a bunch of coins
-        conditions_dict: Dict = {ConditionOpcode.CREATE_COIN: []}
         # This should fit in one transaction
-        for _ in range(100):
-            receiver_puzzlehash = wallet_receiver.get_new_puzzlehash()
-            puzzle_hashes.append(receiver_puzzlehash)
-            output = ConditionWithArgs(ConditionOpcode.CREATE_COIN, [receiver_puzzlehash, int_to_bytes(10000000000)])
-
-            conditions_dict[ConditionOpcode.CREATE_COIN].append(output)
+        puzzle_hashes = [wallet_receiver.get_new_puzzlehash() for _ in range(100)]
+        amount = int_to_bytes(10000000000)
+        conditions_dict: Dict = {
+            ConditionOpcode.CREATE_COIN: [
+                ConditionWithArgs(ConditionOpcode.CREATE_COIN, [receiver_puzzlehash, amount])
+                for receiver_puzzlehash in puzzle_hashes
+            ]
+        }
 
         spend_bundle = wallet_a.generate_signed_transaction(
             100,
@@ -907,12 +802,17 @@ class TestFullNodeProtocol:
         receiver_puzzlehash = wallet_receiver.get_new_puzzlehash()
         random.seed(b"123465")
         group_size = 3  # We will generate transaction bundles of this size (* standard transaction of around 3-4M cost)
+        # the transactions only go to the mempool, the coins stay the same
+        # throughout the loop, so look them all up in one query
+        coin_records_by_ph = {
+            coin_record.coin.puzzle_hash: coin_record
+            for coin_record in await full_node_1.full_node.coin_store.get_coin_records_by_puzzle_hashes(
+                True, puzzle_hashes[1:]
+            )
+        }
         for i in range(1, len(puzzle_hashes), group_size):
             phs_to_use = [puzzle_hashes[i + j] for j in range(group_size) if (i + j) < len(puzzle_hashes)]
-            coin_records = [
-                (await full_node_1.full_node.coin_store.get_coin_records_by_puzzle_hash(True, puzzle_hash))[0]
-                for puzzle_hash in phs_to_use
-            ]
+            coin_records = [coin_records_by_ph[puzzle_hash] for puzzle_hash in phs_to_use]
 
             last_iteration = (i == len(puzzle_hashes) - group_size) or len(phs_to_use) < group_size
             if last_iteration:
@@ -1037,9 +937,12 @@ class TestFullNodeProtocol:
 
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
 
+        # each node has to get the blocks in order, but the two nodes are
+        # independent of each other
         for block in blocks[-3:]:
-            await full_node_1.full_node.add_block(block, peer)
-            await full_node_2.full_node.add_block(block, peer)
+            await asyncio.gather(
+                full_node_1.full_node.add_block(block, peer), full_node_2.full_node.add_block(block, peer)
+            )
 
         # Farm another block to clear mempool
         await full_node_1.farm_new_transaction_block(FarmNewBlockProtocol(wallet_ph))
@@ -1060,7 +963,7 @@ class TestFullNodeProtocol:
         assert res is None
 
         # Check broadcast
-        await time_out_assert(10, time_out_messages(incoming_queue, "new_transaction"))
+        await wait_for_messages(10, incoming_queue, "new_transaction")
 
         request_transaction = fnp.RequestTransaction(spend_bundle.get_hash())
         msg = await full_node_1.request_transaction(request_transaction)
@@ -1074,6 +977,10 @@ class TestFullNodeProtocol:
         cb_ph = wallet_a.get_new_puzzlehash()
 
         incoming_queue, dummy_node_id = await add_dummy_connection(server_1, self_hostname, 12312)
+        expected_requests = 0
+        if await full_node_1.full_node.synced():
+            expected_requests = 1
+        await wait_for_messages(10, incoming_queue, "request_mempool_transactions", expected_requests)
         peer = await connect_and_get_peer(server_1, server_2, self_hostname)
 
         tx_id = bytes32.random(seeded_random)
@@ -1090,15 +997,19 @@ class TestFullNodeProtocol:
             farmer_reward_puzzle_hash=cb_ph,
             pool_reward_puzzle_hash=cb_ph,
         )
-        await asyncio.sleep(1)
-        while incoming_queue.qsize() > 0:
-            await incoming_queue.get()
+        # the dummy peer's handshake messages were waited for above, only drop
+        # whatever else is already queued
+        try:
+            while True:
+                incoming_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
 
         await full_node_1.full_node.add_block(blocks_new[-3], peer)
         await full_node_1.full_node.add_block(blocks_new[-2], peer)
         await full_node_1.full_node.add_block(blocks_new[-1], peer)
 
-        await time_out_assert(10, time_out_messages(incoming_queue, "new_peak", 3))
+        await wait_for_messages(10, incoming_queue, "new_peak", 3)
         # Invalid transaction does not propagate
         spend_bundle = wallet_a.generate_signed_transaction(
             100000000000000,
@@ -1111,20 +1022,24 @@ class TestFullNodeProtocol:
         msg = await full_node_1.respond_transaction(respond_transaction, peer)
         assert msg is None
 
-        await asyncio.sleep(1)
-        assert incoming_queue.qsize() == 0
+        # the transaction is processed in the background, give it a second to
+        # (not) be broadcast, but fail as soon as anything is
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(incoming_queue.get(), timeout=1)
+        assert incoming_queue.empty()
 
     @pytest.mark.anyio
     async def test_request_block(self, wallet_nodes):
         full_node_1, full_node_2, server_1, server_2, wallet_a, wallet_receiver, bt = wallet_nodes
+        wallet_ph = wallet_a.get_new_puzzlehash()
         blocks = await full_node_1.get_all_full_blocks()
 
         blocks = bt.get_consecutive_blocks(
             3,
             block_list_input=blocks,
             guarantee_transaction_block=True,
-            farmer_reward_puzzle_hash=wallet_a.get_new_puzzlehash(),
-            pool_reward_puzzle_hash=wallet_a.get_new_puzzlehash(),
+            farmer_reward_puzzle_hash=wallet_ph,
+            pool_reward_puzzle_hash=wallet_ph,
         )
         spend_bundle = wallet_a.generate_signed_transaction(
             1123,
@@ -1159,6 +1074,7 @@ class TestFullNodeProtocol:
     @pytest.mark.anyio
     async def test_request_blocks(self, wallet_nodes):
         full_node_1, full_node_2, server_1, server_2, wallet_a, wallet_receiver, bt = wallet_nodes
+        wallet_ph = wallet_a.get_new_puzzlehash()
         blocks = await full_node_1.get_all_full_blocks()
 
         # create more blocks than constants.MAX_BLOCK_COUNT_PER_REQUEST (32)
@@ -1166,8 +1082,8 @@ class TestFullNodeProtocol:
             33,
             block_list_input=blocks,
             guarantee_transaction_block=True,
-            farmer_reward_puzzle_hash=wallet_a.get_new_puzzlehash(),
-            pool_reward_puzzle_hash=wallet_a.get_new_puzzlehash(),
+            farmer_reward_puzzle_hash=wallet_ph,
+            pool_reward_puzzle_hash=wallet_ph,
         )
 
         spend_bundle = wallet_a.generate_signed_transaction(
@@ -1562,7 +1478,7 @@ class TestFullNodeProtocol:
 
         rb_task = asyncio.create_task(full_node_2.full_node.add_block(block_2, dummy_peer))
 
-        await time_out_assert(10, time_out_messages(incoming_queue, "request_block", 1))
+        await wait_for_messages(10, incoming_queue, "request_block", 1)
         rb_task.cancel()
 
     @pytest.mark.anyio
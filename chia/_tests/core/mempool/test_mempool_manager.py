@@ -956,6 +956,31 @@ async def test_get_items_not_in_filter() -> None:
     assert result == [sb1]
 
 
+@pytest.mark.anyio
+async def test_reset() -> None:
+    mempool_manager = await instantiate_mempool_manager(get_coin_records_for_test_coins)
+    pool = mempool_manager.pool
+    conditions = [[ConditionOpcode.CREATE_COIN, IDENTITY_PUZZLE_HASH, 1]]
+    sb, sb_name, result = await generate_and_add_spendbundle(mempool_manager, conditions)
+    assert result[1] == MempoolInclusionStatus.SUCCESS
+    assert mempool_manager.get_spendbundle(sb_name) == sb
+    mempool_manager.add_and_maybe_pop_seen(sb_name)
+
+    mempool_manager.reset()
+    assert mempool_manager.peak is None
+    assert mempool_manager.get_spendbundle(sb_name) is None
+    assert mempool_manager.mempool.size() == 0
+    assert not mempool_manager.seen(sb_name)
+    # the worker pool survives the reset
+    assert mempool_manager.pool is pool
+
+    # the mempool is usable again once it has a new peak
+    await mempool_manager.new_peak(create_test_block_record(), None)
+    _, status, error = await add_spendbundle(mempool_manager, sb, sb_name)
+    assert (status, error) == (MempoolInclusionStatus.SUCCESS, None)
+    assert mempool_manager.get_spendbundle(sb_name) == sb
+
+
 @pytest.mark.anyio
 async def test_total_mempool_fees() -> None:
     coin_records: Dict[bytes32, CoinRecord] = {}
@@ -19,6 +19,7 @@ from chia.types.blockchain_format.coin import Coin
 from chia.types.blockchain_format.program import Program
 from chia.types.blockchain_format.serialized_program import SerializedProgram
 from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.full_block import reward_coin_by_puzzle_hash
 from chia.types.generator_types import BlockGenerator
 from chia.util.ints import uint32, uint64
 from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
@@ -123,11 +124,7 @@ async def test_mempool_mode(softfork_height: int, bt: BlockTools) -> None:
         num_blocks, [], guarantee_transaction_block=True, pool_reward_puzzle_hash=ph, farmer_reward_puzzle_hash=ph
     )
 
-    coinbase = None
-    for coin in blocks[2].get_included_reward_coins():
-        if coin.puzzle_hash == ph:
-            coinbase = coin
-            break
+    coinbase = reward_coin_by_puzzle_hash(blocks[2], ph)
     assert coinbase is not None
     spend_bundle = wallet_tool.generate_signed_transaction(
         uint64(coinbase.amount),
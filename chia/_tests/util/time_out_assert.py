@@ -152,3 +152,24 @@ def time_out_messages(incoming_queue: asyncio.Queue, msg_name: str, count: int =
         return True
 
     return bool_f
+
+
+async def wait_for_messages(timeout: float, incoming_queue: asyncio.Queue, msg_name: str, count: int = 1) -> None:
+    # the event driven counterpart of time_out_assert() with time_out_messages(),
+    # returning as soon as the messages are queued rather than on the next poll
+    __tracebackhide__ = True
+
+    async def receive() -> None:
+        matched = 0
+        while matched < count:
+            response = (await incoming_queue.get()).type
+            if ProtocolMessageTypes(response).name == msg_name:
+                matched += 1
+            else:
+                # like time_out_messages(), any other message starts the count over
+                matched = 0
+
+    try:
+        await asyncio.wait_for(receive(), adjusted_timeout(timeout=timeout))
+    except asyncio.TimeoutError:
+        assert False, f"Timed out waiting for {count} {msg_name} message(s)"
@@ -179,6 +179,7 @@ class MempoolManager:
     _pending_cache: PendingTxCache
     seen_cache_size: int
     peak: Optional[BlockRecordProtocol]
+    fee_estimator: FeeEstimatorInterface
     mempool: Mempool
     _worker_queue_size: int
     max_block_clvm_cost: uint64
@@ -195,9 +196,6 @@ class MempoolManager:
     ):
         self.constants: ConsensusConstants = consensus_constants
 
-        # Keep track of seen spend_bundles
-        self.seen_bundle_hashes: Dict[bytes32, bytes32] = {}
-
         self.get_coin_records = get_coin_records
 
         # The fee per cost must be above this amount to consider the fee "nonzero", and thus able to kick out other
@@ -212,9 +210,6 @@ class MempoolManager:
         )
         self.mempool_max_total_cost = int(self.constants.MAX_BLOCK_COST_CLVM * self.constants.MEMPOOL_BLOCK_BUFFER)
 
-        # Transactions that were unable to enter mempool, used for retry. (they were invalid)
-        self._conflict_cache = ConflictTxCache(self.constants.MAX_BLOCK_COST_CLVM * 1, 1000)
-        self._pending_cache = PendingTxCache(self.constants.MAX_BLOCK_COST_CLVM * 1, 1000)
         self.seen_cache_size = 10000
         self._worker_queue_size = 0
         if single_threaded:
@@ -227,15 +222,29 @@ class MempoolManager:
                 initargs=(f"{getproctitle()}_mempool_worker",),
             )
 
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drops all transactions, caches and the peak, leaving the mempool in the
+        same state as a newly constructed one. The worker pool is kept running.
+        """
+        # Keep track of seen spend_bundles
+        self.seen_bundle_hashes = {}
+
+        # Transactions that were unable to enter mempool, used for retry. (they were invalid)
+        self._conflict_cache = ConflictTxCache(self.constants.MAX_BLOCK_COST_CLVM * 1, 1000)
+        self._pending_cache = PendingTxCache(self.constants.MAX_BLOCK_COST_CLVM * 1, 1000)
+
         # The mempool will correspond to a certain peak
-        self.peak: Optional[BlockRecordProtocol] = None
-        self.fee_estimator: FeeEstimatorInterface = create_bitcoin_fee_estimator(self.max_block_clvm_cost)
+        self.peak = None
+        self.fee_estimator = create_bitcoin_fee_estimator(self.max_block_clvm_cost)
         mempool_info = MempoolInfo(
             CLVMCost(uint64(self.mempool_max_total_cost)),
             FeeRate(uint64(self.nonzero_fee_minimum_fpc)),
             CLVMCost(uint64(self.max_block_clvm_cost)),
         )
-        self.mempool: Mempool = Mempool(mempool_info, self.fee_estimator)
+        self.mempool = Mempool(mempool_info, self.fee_estimator)
 
     def shut_down(self) -> None:
         self.pool.shutdown(wait=True)
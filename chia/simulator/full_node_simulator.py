@@ -759,6 +759,23 @@ class FullNodeSimulator(FullNodeAPI):
                     break
                 await asyncio.sleep(backoff_time)
 
+    async def wait_for_peak_height(
+        self,
+        height: uint32,
+        timeout: Optional[float] = 5,
+    ) -> None:
+        """Wait until the peak of the blockchain is at least at the given height.
+
+        Arguments:
+            height: The height to wait for.
+        """
+        with anyio.fail_after(delay=adjusted_timeout(timeout)):
+            for backoff_time in backoff_times():
+                peak_height = self.full_node.blockchain.get_peak_height()
+                if peak_height is not None and peak_height >= height:
+                    break
+                await asyncio.sleep(backoff_time)
+
     async def wait_for_self_synced(
         self,
         timeout: Optional[float] = 5,
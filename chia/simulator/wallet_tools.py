@@ -144,18 +144,17 @@ class WalletTool:
             puzzle: Program = puzzle_for_pk(pubkey)
             if n == 0:
                 message_list = [c.name() for c in coins]
+                # the primary coin's ID is needed for every output and the
+                # announcement, reuse the one we just computed
+                coin_id = message_list[0]
                 for outputs in condition_dic[ConditionOpcode.CREATE_COIN]:
-                    coin_to_append = Coin(
-                        coin.name(), bytes32(outputs.vars[0]), uint64(int_from_bytes(outputs.vars[1]))
-                    )
+                    coin_to_append = Coin(coin_id, bytes32(outputs.vars[0]), uint64(int_from_bytes(outputs.vars[1])))
                     message_list.append(coin_to_append.name())
                 message = std_hash(b"".join(message_list))
                 condition_dic[ConditionOpcode.CREATE_COIN_ANNOUNCEMENT].append(
                     ConditionWithArgs(ConditionOpcode.CREATE_COIN_ANNOUNCEMENT, [message])
                 )
-                primary_announcement_hash = AssertCoinAnnouncement(
-                    asserted_id=coin.name(), asserted_msg=message
-                ).msg_calc
+                primary_announcement_hash = AssertCoinAnnouncement(asserted_id=coin_id, asserted_msg=message).msg_calc
                 secondary_coins_cond_dic[ConditionOpcode.ASSERT_COIN_ANNOUNCEMENT].append(
                     ConditionWithArgs(ConditionOpcode.ASSERT_COIN_ANNOUNCEMENT, [primary_announcement_hash])
                 )
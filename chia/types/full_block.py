@@ -1,5 +1,18 @@
 from __future__ import annotations
 
+from typing import Optional
+
 import chia_rs
 
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+
 FullBlock = chia_rs.FullBlock
+
+
+def reward_coin_by_puzzle_hash(block: FullBlock, puzzle_hash: bytes32) -> Optional[Coin]:
+    """
+    Returns the first reward coin included in the block paying to puzzle_hash, or
+    None if there is no such coin.
+    """
+    return next((coin for coin in block.get_included_reward_coins() if coin.puzzle_hash == puzzle_hash), None)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
 
 from chia_rs import AugSchemeMPL, G2Element
 
@@ -29,7 +29,7 @@ class SpendBundle(Streamable):
     aggregated_signature: G2Element
 
     @classmethod
-    def aggregate(cls, spend_bundles: List[SpendBundle]) -> SpendBundle:
+    def aggregate(cls, spend_bundles: Sequence[SpendBundle]) -> SpendBundle:
         coin_spends: List[CoinSpend] = []
         sigs: List[G2Element] = []
         for bundle in spend_bundles: